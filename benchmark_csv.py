@@ -0,0 +1,74 @@
+# Compare the parallel CSV reader of excel9 with pd.read_csv by number of cores.
+# Usage: python benchmark_csv.py [file.csv] (without a file a test file is written to the temp directory)
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import excel9
+
+# Rows of the generated test file (about 60 MB)
+TEST_ROWS = 2_000_000
+
+
+# Write a CSV file with a header row, numbers, text with quotes and commas, and empty cells
+def write_test_file(filepath, rows):
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({
+        "id": np.arange(rows),
+        "amount": rng.normal(1000, 250, rows).round(2),
+        "count": rng.integers(0, 100, rows),
+        "city": rng.choice(["Pune", "Delhi", "Mumbai, MH", 'The "Big" Apple', ""], rows),
+        "note": rng.choice(["ok", "late", "multi\nline", None], rows),
+    })
+    data.to_csv(filepath, index=False)
+
+
+# Core counts to try: 1, 2, 4, ... and the machine's own count
+def core_counts():
+    counts, count = list(), 1
+    while count < os.cpu_count():
+        counts.append(count)
+        count *= 2
+    return counts + [os.cpu_count()]
+
+
+def main():
+    filepath = sys.argv[1] if len(sys.argv) > 1 else os.path.join(tempfile.gettempdir(), "benchmark_test.csv")
+    if len(sys.argv) <= 1 and not os.path.exists(filepath):
+        print(f"Writing {TEST_ROWS:,} rows to {filepath}")
+        write_test_file(filepath, TEST_ROWS)
+    print(f"{filepath}: {os.path.getsize(filepath) / 2 ** 20:.0f} MB")
+
+    # pd.read_csv parses in blocks by default and can leave a column with mixed types (with a
+    # DtypeWarning), the parallel reader then matches a single block read (low_memory=False)
+    start = time.perf_counter()
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", pd.errors.DtypeWarning)
+        expected = pd.read_csv(filepath, header=None)
+    baseline = time.perf_counter() - start
+    print(f"pd.read_csv: {baseline:.2f} s")
+    if caught:
+        start = time.perf_counter()
+        expected = pd.read_csv(filepath, header=None, low_memory=False)
+        print(f"pd.read_csv gave mixed-type columns, comparing with low_memory=False "
+              f"({time.perf_counter() - start:.2f} s)")
+
+    for cores in core_counts():
+        with ProcessPoolExecutor(max_workers=cores, mp_context=multiprocessing.get_context("spawn")) as pool:
+            # Start the workers before timing, as the app's pool is already running
+            list(pool.map(abs, range(cores)))
+            start = time.perf_counter()
+            data = excel9.read_csv_parallel(filepath, pool=pool)
+            elapsed = time.perf_counter() - start
+        same = data.equals(expected) and (data.dtypes == expected.dtypes).all()
+        print(f"{cores:3d} cores: {elapsed:.2f} s, speedup {baseline / elapsed:.2f}x, "
+              f"{'identical' if same else 'DIFFERENT'} to pd.read_csv")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,158 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
+import atexit
+import csv
+import hashlib
+import io
+import mmap
+import multiprocessing
+import os
+import queue
+import re
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait
+from functools import lru_cache
+from multiprocessing import shared_memory
+import numpy as np
 import pandas as pd
+from pandas.tseries.api import guess_datetime_format
 from tkinter import simpledialog
 from tkinter import colorchooser
 
+# pyarrow is optional, without it the parsed-file cache is written with pickle
+try:
+    from pyarrow import feather
+except ImportError:
+    feather = None
+
+# Loaded data is handed to the Tk thread as a shallow copy while the load worker caches the
+# parser's frame. Copy-on-write, the default from pandas 3, keeps edits out of the cached one
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
 # Global Variables
 full_data = pd.DataFrame()
+column_store = list()
+store_lock = threading.Lock()
+store_edits = 0
+filter_cache = OrderedDict()
+filter_cache_bytes = 0
+filter_generation = 0
+filter_job = None
+filter_running = None
+filter_results = queue.Queue()
+load_generation = 0
+load_results = queue.Queue()
+load_shown = False
+load_reading = None
+load_edits = None
+mapped_file = None
+process_pool = None
+shared_blocks = dict()
+shared_lock = threading.Lock()
 rows, cols = 0, 0
-highlighted_cells = set()
-highlighted_rows = set()
-highlighted_columns = set()
+top_row = 0
+highlighted_cells = dict()
+highlighted_rows = dict()
+highlighted_columns = dict()
 selected_cell = None
 selected_row = None
 selected_col = None
-filter_entries = list()
+filter_state = dict()
+filter_slots = dict()
+filter_pool = list()
+filter_columns = None
+view_rows = np.arange(0)
+filter_rows = np.arange(0)
+sort_keys = list()
+grid = dict()
+cell_pool = list()
+editing_cell = None
+render_job = None
+pending_cells = list()
+
+# Size of one cell in the virtual grid (pixels, characters of text)
+ROW_HEIGHT = 30
+COL_WIDTH = 130
+CELL_CHARS = 17
+FILTER_HEIGHT = 90
+
+# Time spent drawing cells before handing control back to the mainloop (seconds)
+RENDER_BUDGET = 0.01
+
+# Text columns with fewer distinct values than this share of rows are stored as categories
+CATEGORY_RATIO = 0.5
+
+# Text values tried as dates before a whole text column is parsed as dates
+DATE_SAMPLE = 200
+
+# Trigram index for "Contains": columns with fewer distinct values are scanned directly,
+# longer values are not indexed, values are indexed this many at a time
+INDEX_MIN_VALUES = 10000
+INDEX_MAX_CHARS = 64
+INDEX_BLOCK = 65536
+
+# Range filters: 'min-max' and one-sided bounds such as '>=10' or '<-2.5'
+NUMBER = r"\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*"
+RANGE_PATTERN = re.compile(rf"^{NUMBER}-{NUMBER}$")
+BOUND_PATTERN = re.compile(rf"^\s*(>=|<=|>|<){NUMBER}$")
+
+# Expression filters: an optional 'not' or '!', an operator and its argument, such as '> 10',
+# '!= done', 'startswith ab', 'in a, b, c', 'is empty', 'regex ^a.*z$' or 'not endswith .tmp'
+EXPRESSION_PATTERN = re.compile(r"^(?:(not)\s+|(!)(?!=))?\s*(?:(>=|<=|!=|==|=|>|<|~)|"
+                                r"(startswith|endswith|contains|in|regex|is\s+empty|empty)\b)\s*(.*)$",
+                                re.IGNORECASE | re.DOTALL)
+
+# Filters run this long after the last keystroke, finished ones are picked up this often (ms)
+FILTER_DELAY = 300
+FILTER_POLL = 50
+
+# Sheets with at least this many rows are filtered by several processes
+PARALLEL_MIN_ROWS = 5_000_000
+
+# Text filters checking at least this many distinct values spread them over the processes
+PARALLEL_MIN_VALUES = 200_000
+
+# Values offered in each filter dropdown
+DROPDOWN_VALUES = 500
+
+# Rows looked at to estimate how selective each filter is
+SAMPLE_ROWS = 1000
+
+# Column profiles: rows sampled for the top values, values listed, and bits of the
+# HyperLogLog register index used to estimate distinct counts (4096 registers, ~1.6% error)
+PROFILE_SAMPLE = 100_000
+PROFILE_TOP = 5
+PROFILE_BITS = 12
+
+# Memory kept for cached filter results (bytes of row ids)
+FILTER_CACHE_BYTES = 256 * 1024 * 1024
+
+# CSV files stream in: a small first chunk to show quickly, then larger ones.
+# Loaded chunks are picked up this often (ms)
+LOAD_FIRST_ROWS = 10_000
+LOAD_CHUNK_ROWS = 200_000
+LOAD_POLL = 100
+
+# CSV files of at least PARALLEL_PARSE_BYTES are parsed by several processes, split into
+# partitions of about PARSE_BLOCK bytes. Row ends are looked for PARSE_WINDOW bytes at a time
+PARALLEL_PARSE_BYTES = 64 * 1024 * 1024
+PARSE_BLOCK = 32 * 1024 * 1024
+PARSE_WINDOW = 1024 * 1024
+
+# Parsed files are cached here for quick reopening, least recently used ones are removed
+# once the cache holds more than CACHE_BYTES
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "excel9")
+CACHE_BYTES = 4 * 1024 * 1024 * 1024
+
+# Memory-mapped CSV files: bytes scanned per step of the row index, rows sharing one 64-bit
+# base offset (each row keeps a 32-bit offset from it), parsed rows kept for redrawing
+MAP_BLOCK = 64 * 1024 * 1024
+MAP_ROW_GROUP = 65536
+MAP_CACHE_ROWS = 2000
 
 # Load file (Excel or CSV)
 def load_file():
@@ -21,21 +160,491 @@ def load_file():
         filetypes=[("Excel files", "*.xlsx *.xls"), ("CSV files", "*.csv"), ("All files", "*.*")]
     )
     if filepath:
-        global full_data
         try:
-            if filepath.endswith((".xlsx", ".xls")):
-                full_data = pd.read_excel(filepath, header=None)
-            elif filepath.endswith(".csv"):
-                full_data = pd.read_csv(filepath, header=None)
+            if filepath.endswith((".xlsx", ".xls", ".csv")):
+                start_load(filepath)
             else:
                 messagebox.showerror("Error", "Unsupported file format. Please select a CSV or Excel file.")
-                return
-            create_dynamic_grid(full_data)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load file: {str(e)}")
 
+# Show a newly loaded dataset and its column store with no filters, sort or highlights.
+# A memory-mapped file is shown instead of full_data, which is then left empty
+def show_new_data(data, store, mapped=None):
+    global mapped_file
+    if mapped_file is not None:
+        close_mapped(mapped_file)
+    mapped_file = mapped
+    swap_column_store(data, store)
+    forget_filter_results()
+    filter_state.clear()
+    sort_keys.clear()
+    reset_highlight()
+    create_dynamic_grid(all_rows())
+
+# Row ids of every row, a range for memory-mapped files so nothing per row is allocated
+def all_rows():
+    if mapped_file is not None:
+        return range(mapped_file["rows"])
+    return np.arange(len(full_data))
+
+# Read a file in a worker thread, superseding any load in progress. The current dataset stays
+# usable until the new one is swapped in, for CSV files that is when the first chunk is parsed
+def start_load(filepath):
+    global load_generation, load_shown, load_reading, load_edits
+    cancel_load()
+    load_generation += 1
+    load_shown = False
+    load_reading = None
+    load_edits = None
+    key = cache_key(filepath)
+    threading.Thread(target=load_worker, args=(load_generation, filepath, key), daemon=True).start()
+    show_progress(0.0)
+
+# Runs in a worker thread: a file that has not changed since it was last parsed comes from
+# the cache, CSV files are streamed in chunks and Excel files are read whole. Datasets are queued
+# with their column store. What the parser gave is cached under key, the Tk thread gets a
+# shallow copy so edits never reach the cache
+def load_worker(generation, filepath, key):
+    try:
+        data = read_cached_file(filepath)
+        if data is not None:
+            load_results.put((generation, "loaded", (data, build_store(data))))
+        elif filepath.endswith(".csv") and os.path.getsize(filepath) >= PARALLEL_PARSE_BYTES and os.cpu_count() > 1:
+            # The first rows are shown while the processes parse the whole file
+            preview = pd.read_csv(filepath, header=None, nrows=LOAD_FIRST_ROWS)
+            load_results.put((generation, "rows", (preview, build_store(preview), 0.0, len(preview))))
+            progress = lambda fraction: load_results.put((generation, "progress", (fraction, None)))
+            data = read_csv_parallel(filepath, progress=progress, cancelled=lambda: generation != load_generation)
+            if data is not None:
+                load_results.put((generation, "loaded", (data.copy(deep=False), build_store(data))))
+                write_cached_file(filepath, key, data)
+        elif filepath.endswith(".csv"):
+            stream_csv(generation, filepath, key)
+        else:
+            # The Tk thread follows the bytes read through the open file while pandas parses it
+            with open(filepath, "rb") as file:
+                load_results.put((generation, "reading", (file, max(1, os.fstat(file.fileno()).st_size))))
+                data = pd.read_excel(file, header=None)
+            load_results.put((generation, "loaded", (data.copy(deep=False), build_store(data))))
+            write_cached_file(filepath, key, data)
+    except Exception as e:
+        load_results.put((generation, "error", e))
+
+# Parse a CSV file in chunks. The rows parsed so far are queued with their column store, the share
+# of the file read and the row count each time they double, so rows are copied and typed a bounded
+# number of times over the whole load. A file read to the end is cached as parsed, the same
+# DataFrame as pd.read_csv(filepath, header=None)
+def stream_csv(generation, filepath, key):
+    size = max(1, os.path.getsize(filepath))
+    rows = shown = 0
+    chunks = list()
+    dtypes, serial = dict(), set()
+    with open(filepath, "rb") as file:
+        reader = pd.read_csv(file, header=None, chunksize=LOAD_FIRST_ROWS, low_memory=False,
+                             dtype=header_dtypes(filepath) or None)
+        for chunk in reader:
+            if generation != load_generation:
+                return
+            rows += len(chunk)
+            chunks.append(chunk)
+
+            # Chunks are typed one by one. Ints and floats concatenate to the floats a single read
+            # gives, columns with other mixes of types are read again in one piece at the end
+            for c in chunk.columns:
+                dtype = dtypes.setdefault(c, chunk[c].dtype)
+                if chunk[c].dtype != dtype and not {chunk[c].dtype, dtype} <= {np.dtype(np.int64), np.dtype(float)}:
+                    serial.add(c)
+            if rows >= 2 * shown:
+                shown = rows
+                chunks = [pd.concat(chunks, ignore_index=True)]
+                load_results.put((generation, "rows", (chunks[0].copy(deep=False), build_store(chunks[0]),
+                                                       file.tell() / size, rows)))
+            else:
+                load_results.put((generation, "progress", (file.tell() / size, rows)))
+            reader.chunksize = LOAD_CHUNK_ROWS
+    data = pd.concat(chunks, ignore_index=True)
+    if serial:
+        serial = sorted(serial)
+        data[serial] = pd.read_csv(filepath, header=None, usecols=serial, low_memory=False)
+    if rows > shown or serial:
+        load_results.put((generation, "rows", (data.copy(deep=False), build_store(data), 1.0, rows)))
+    load_results.put((generation, "done", None))
+    write_cached_file(filepath, key, data)
+
+# Parse a CSV file in the process pool (or the given pool), giving the same DataFrame as
+# pd.read_csv(filepath, header=None). Returns None when cancelled. Row ends are found by
+# counting quotes, so quotes are expected only around whole fields
+def read_csv_parallel(filepath, pool=None, progress=None, cancelled=None):
+    pool = pool or get_process_pool()
+    ranges = csv_partitions(filepath, max(os.cpu_count(), -(-os.path.getsize(filepath) // PARSE_BLOCK)))
+
+    forced = header_dtypes(filepath)
+    frames = parse_partitions(pool, filepath, [(start, stop, forced) for start, stop in ranges], progress, cancelled)
+    if frames is None:
+        return None
+    ranges = [bounds for bounds, frame in zip(ranges, frames) if frame is not None]
+    frames = [frame for frame in frames if frame is not None]
+    if not frames:
+        raise pd.errors.EmptyDataError("No columns to parse from file")
+    if len({frame.shape[1] for frame in frames}) > 1:
+        # Rows of different lengths are padded or rejected by the whole file's first row
+        return pd.read_csv(filepath, header=None)
+
+    # A column whose type differs between partitions gets the type a single read gives it:
+    # text if any partition has text, float if all are numbers. Partitions that guessed
+    # another type are parsed again with it, other mixes are read again in one piece
+    targets, serial = dict(), list()
+    for c in frames[0].columns:
+        dtypes = {frame[c].dtype for frame in frames}
+        if len(dtypes) == 1:
+            continue
+        if any(is_text(frame[c]) for frame in frames):
+            targets[c] = str
+        elif all(dtype in (np.dtype(np.int64), np.dtype(float)) for dtype in dtypes):
+            targets[c] = float
+        else:
+            serial.append(c)
+
+    if targets:
+        jobs, retry = list(), list()
+        for i, ((start, stop), frame) in enumerate(zip(ranges, frames)):
+            wrong = {c: dtype for c, dtype in targets.items()
+                     if not (is_text(frame[c]) if dtype is str else frame[c].dtype == np.dtype(float))}
+            if wrong:
+                jobs.append((start, stop, {**forced, **wrong}))
+                retry.append(i)
+        for i, frame in zip(retry, parse_partitions(pool, filepath, jobs, None, cancelled) or []):
+            frames[i] = frame
+        if cancelled is not None and cancelled():
+            return None
+
+    data = pd.concat(frames, ignore_index=True)
+    if serial:
+        data[serial] = pd.read_csv(filepath, header=None, usecols=serial)
+    return data
+
+# A first row that is text (a header) makes its columns text in a single read too, so parts
+# of a file read separately are given str for those columns
+def header_dtypes(filepath):
+    first = pd.read_csv(filepath, header=None, nrows=1)
+    return {c: str for c in first.columns if is_text(first[c])}
+
+# True when a column holds text, as pandas stores it with or without the string dtype
+def is_text(series):
+    return (isinstance(series.dtype, pd.StringDtype)
+            or (series.dtype == object and pd.api.types.infer_dtype(series, skipna=True) == "string"))
+
+# Split a file into about parts byte ranges that each start at a row. A newline ends a row
+# when an even number of quotes comes before it in the file
+def csv_partitions(filepath, parts):
+    size = os.path.getsize(filepath)
+    bounds, quotes = [0], 0
+    with open(filepath, "rb") as file:
+        for i in range(1, parts):
+            target = size * i // parts
+            if target <= bounds[-1]:
+                continue
+            file.seek(bounds[-1])
+            quotes += file.read(target - bounds[-1]).count(b'"')
+
+            position, boundary = target, size
+            while True:
+                block = file.read(PARSE_WINDOW)
+                if not block:
+                    break
+                end = first_row_end(block, quotes)
+                if end is not None:
+                    boundary = position + end
+                    quotes += block[:end].count(b'"')
+                    break
+                quotes += block.count(b'"')
+                position += len(block)
+            if boundary >= size:
+                break
+            bounds.append(boundary)
+    bounds.append(size)
+    return [(start, stop) for start, stop in zip(bounds[:-1], bounds[1:]) if start < stop]
+
+# Offset just past the first newline of block that ends a row, quotes counts the quotes before block
+def first_row_end(block, quotes):
+    data = np.frombuffer(block, dtype=np.uint8)
+    quote_positions = np.flatnonzero(data == ord('"'))
+    newlines = np.flatnonzero(data == ord("\n"))
+    ends = newlines[(np.searchsorted(quote_positions, newlines) + quotes) % 2 == 0]
+    return int(ends[0]) + 1 if len(ends) else None
+
+# Parse (start, stop, dtype) byte ranges of a file in the pool, results in order.
+# None when cancelled
+def parse_partitions(pool, filepath, jobs, progress=None, cancelled=None):
+    futures = [pool.submit(parse_partition, filepath, start, stop, dtype) for start, stop, dtype in jobs]
+    pending = set(futures)
+    while pending:
+        if cancelled is not None and cancelled():
+            for future in pending:
+                future.cancel()
+            return None
+        done, pending = wait(pending, timeout=0.1)
+        if progress is not None:
+            progress(1 - len(pending) / len(futures))
+    return [future.result() for future in futures]
+
+# Runs in a worker process: one byte range of a file as a DataFrame, None if it has no rows
+def parse_partition(filepath, start, stop, dtype):
+    with open(filepath, "rb") as file:
+        file.seek(start)
+        data = file.read(stop - start)
+    try:
+        return pd.read_csv(io.BytesIO(data), header=None, dtype=dtype or None)
+    except pd.errors.EmptyDataError:
+        return None
+
+# Pick up load results on the Tk thread. Of the datasets queued since the last poll only the
+# latest is swapped in, the filters set on the rows shown so far are kept
+def poll_load_results():
+    global load_reading, load_shown, load_edits
+    done, latest = False, None
+    while not load_results.empty():
+        generation, event, value = load_results.get()
+        if generation != load_generation:
+            if event == "mapped":
+                close_mapped(value)
+            continue
+        if event == "error":
+            cancel_load()
+            messagebox.showerror("Error", f"Failed to load file: {str(value)}")
+            latest = None
+            break
+        if event == "rows":
+            latest = value[:2]
+            show_progress(*value[2:])
+        elif event == "progress":
+            show_progress(*value)
+        elif event == "reading":
+            load_reading = value
+        elif event == "loaded":
+            load_reading = None
+            latest, done = value, True
+        elif event == "mapped":
+            hide_progress()
+            show_new_data(pd.DataFrame(), list(), value)
+        else:
+            done = True
+
+    if load_reading is not None:
+        file, size = load_reading
+        try:
+            show_progress(file.tell() / size)
+        except ValueError:
+            # The worker closed the file, its result is on the way
+            load_reading = None
+
+    if latest is not None:
+        if load_shown:
+            refresh_loaded_data(*latest)
+        else:
+            show_new_data(*latest)
+            load_shown = True
+
+    # Edits are remembered from when the first rows are shown until the whole file is in
+    if done:
+        hide_progress()
+        load_edits = None
+    elif latest is not None and load_edits is None:
+        load_edits = dict()
+    root.after(LOAD_POLL, poll_load_results)
+
+# Put more of the file being loaded in full_data with its column store and run the current filters over it.
+# Cells edited since the first rows were shown are edited again, the new data was parsed without them
+def refresh_loaded_data(data, store):
+    swap_column_store(data, store)
+    for (row, c), text in list((load_edits or dict()).items()):
+        set_cell_value(row, c, text)
+    forget_filter_results()
+    if normalize_filters(filter_state):
+        start_filter(keep_scroll=True)
+    else:
+        create_dynamic_grid(np.arange(len(full_data)), keep_scroll=True)
+
+# Stop loading, the rows shown so far are kept
+def cancel_load():
+    global load_generation, load_reading, load_edits
+    load_generation += 1
+    load_reading = None
+    load_edits = None
+    hide_progress()
+
+# Progress of the file being loaded, with the button that cancels it
+def show_progress(fraction, rows=None):
+    load_progress.configure(value=fraction * 100)
+    load_label.configure(text=f"Loading {fraction:.0%}" + ("" if rows is None else f", {rows:,} rows"))
+    if not load_frame.winfo_ismapped():
+        load_frame.pack(side="right", padx=5)
+
+def hide_progress():
+    load_frame.pack_forget()
+
+# Name of a file's entry in the parsed-file cache, it changes whenever the file does
+def cache_key(filepath):
+    stat = os.stat(filepath)
+    text = f"{os.path.abspath(filepath)}|{stat.st_size}|{stat.st_mtime_ns}"
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+# Parsed dataset of a file from the cache, None when it was not cached since it last changed.
+# Feather entries are uncompressed and memory-mapped while they are read
+def read_cached_file(filepath):
+    key = cache_key(filepath)
+    for extension in (".feather", ".pkl"):
+        path = os.path.join(CACHE_DIR, key + extension)
+        if not os.path.exists(path) or (extension == ".feather" and feather is None):
+            continue
+        try:
+            if extension == ".feather":
+                data = feather.read_table(path, memory_map=True).to_pandas()
+                data.columns = data.columns.astype(int)
+            else:
+                data = pd.read_pickle(path)
+        except Exception:
+            # A damaged entry is dropped and the file is parsed again
+            os.remove(path)
+            continue
+        os.utime(path)
+        return data
+    return None
+
+# Runs in a worker thread: store a parsed dataset unless its file changed while it was loading
+def write_cached_file(filepath, key, data):
+    try:
+        if cache_key(filepath) != key:
+            return
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        path = os.path.join(CACHE_DIR, key)
+        written = None
+        if feather is not None:
+            try:
+                table = data.copy(deep=False)
+                table.columns = table.columns.astype(str)
+                feather.write_feather(table, path + ".tmp", compression="uncompressed")
+                written = path + ".feather"
+            except (TypeError, ValueError):
+                # Arrow cannot store columns that mix types, such as a header above numbers
+                pass
+        if written is None:
+            data.to_pickle(path + ".tmp")
+            written = path + ".pkl"
+        os.replace(path + ".tmp", written)
+        evict_cached_files()
+    except OSError:
+        # The cache only saves time, the file is parsed again next time
+        pass
+
+# Remove the least recently used cache entries until the cache fits in CACHE_BYTES
+def evict_cached_files():
+    entries = [(entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in os.scandir(CACHE_DIR)
+               if entry.name.endswith((".feather", ".pkl"))]
+    total = sum(size for used, size, path in entries)
+    for used, size, path in sorted(entries):
+        if total <= CACHE_BYTES:
+            break
+        os.remove(path)
+        total -= size
+
+# Runs in a worker thread: map a CSV file and find where each row starts in one pass.
+# A newline ends a row unless an odd number of quotes comes before it, then it is inside a field
+def mapped_index_worker(generation, filepath):
+    try:
+        with open(filepath, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if size == 0:
+                raise ValueError("The file is empty.")
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        bases, offsets, rows, quoted = list(), list(), 0, False
+        starts = np.zeros(1, dtype=np.int64)
+        for start in range(0, size, MAP_BLOCK):
+            if generation != load_generation:
+                mapped.close()
+                return
+            block = np.frombuffer(mapped, dtype=np.uint8, count=min(MAP_BLOCK, size - start), offset=start)
+            quotes = np.flatnonzero(block == ord('"'))
+            newlines = np.flatnonzero(block == ord("\n"))
+            inside = (np.searchsorted(quotes, newlines) + quoted) % 2 == 1
+            starts = np.r_[starts, newlines[~inside] + start + 1]
+            quoted = (len(quotes) + quoted) % 2 == 1
+            del block
+
+            # Rows are stored as an offset from the start of their group of MAP_ROW_GROUP rows
+            starts = starts[starts < size]
+            ids = rows + np.arange(len(starts))
+            bases.extend(starts[ids % MAP_ROW_GROUP == 0].tolist())
+            relative = starts - np.array(bases, dtype=np.int64)[ids // MAP_ROW_GROUP]
+            if len(relative) and relative.max() >= 2 ** 32:
+                raise ValueError("Rows are too long to be indexed.")
+            offsets.append(relative.astype(np.uint32))
+            rows += len(starts)
+            starts = np.zeros(0, dtype=np.int64)
+            load_results.put((generation, "progress", (min(1.0, (start + MAP_BLOCK) / size), None)))
+
+        mapped = {"map": mapped, "size": size, "rows": rows, "bases": np.array(bases, dtype=np.int64),
+                  "offsets": np.concatenate(offsets), "cache": OrderedDict()}
+        mapped["columns"] = max(len(mapped_row(mapped, row)) for row in range(min(rows, 100)))
+        load_results.put((generation, "mapped", mapped))
+    except Exception as e:
+        load_results.put((generation, "error", e))
+
+# Byte offset where row starts in a memory-mapped file
+def row_start(mapped, row):
+    if row >= mapped["rows"]:
+        return mapped["size"]
+    return int(mapped["bases"][row // MAP_ROW_GROUP]) + int(mapped["offsets"][row])
+
+# Fields of one row of a memory-mapped file, parsed when first shown
+def mapped_row(mapped, row):
+    cache = mapped["cache"]
+    if row in cache:
+        cache.move_to_end(row)
+        return cache[row]
+    line = mapped["map"][row_start(mapped, row):row_start(mapped, row + 1)]
+    text = line.decode("utf-8", errors="replace").rstrip("\r\n")
+    fields = next(csv.reader(io.StringIO(text, newline="")), [])
+    cache[row] = fields
+    if len(cache) > MAP_CACHE_ROWS:
+        cache.popitem(last=False)
+    return fields
+
+def close_mapped(mapped):
+    mapped["cache"].clear()
+    mapped["map"].close()
+
+# Value of a cell of the sheet, from full_data or from the memory-mapped file
+def cell_value(row, c):
+    if mapped_file is not None:
+        fields = mapped_row(mapped_file, row)
+        return fields[c] if c < len(fields) else ""
+    return full_data.iat[row, c]
+
+# Memory-mapped files are only viewed: filters, sorting, profiles, edits and saving need full_data
+def refuse_mapped(show_error=True):
+    if mapped_file is None:
+        return False
+    if show_error:
+        messagebox.showinfo("Memory-mapped file", "Open the file with Open File to filter, sort, edit or save it.")
+    return True
+
+# Open a CSV file too large for memory: it is memory-mapped and only the rows on screen are parsed
+def open_mapped_file():
+    global load_generation
+    filepath = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+    if filepath:
+        cancel_load()
+        load_generation += 1
+        threading.Thread(target=mapped_index_worker, args=(load_generation, filepath), daemon=True).start()
+        show_progress(0.0)
+
 # Save file (Excel or CSV)
 def save_file():
+    if refuse_mapped():
+        return
     filepath = filedialog.asksaveasfilename(
         defaultextension=".csv", filetypes=[("Excel files", "*.xlsx"), ("CSV files", "*.csv")]
     )
@@ -54,35 +663,889 @@ def save_file():
 
 # Apply filter for individual columns
 def apply_filter():
+    start_filter(show_errors=True)
+
+# Filter again a moment after the user stops typing or picks another condition
+def schedule_filter():
+    global filter_job
+    if filter_job is not None:
+        root.after_cancel(filter_job)
+    filter_job = root.after(FILTER_DELAY, start_filter)
+
+# Start evaluating the current filters in a worker thread, superseding any earlier request.
+# With keep_scroll the result is shown like rows added by a load, without moving the view
+def start_filter(show_errors=False, keep_scroll=False):
+    global filter_job, filter_generation, filter_running
+    if filter_job is not None:
+        root.after_cancel(filter_job)
+        filter_job = None
+    if refuse_mapped(show_errors):
+        return
     try:
-        global full_data
-        filtered_data = full_data.copy()
-
-        for c in range(cols):
-            filter_value = filter_entries[c].get().strip()
-            if filter_value:
-                if filter_conditions[c].get() == "Contains":
-                    filtered_data = filtered_data[filtered_data[c].astype(str).str.contains(filter_value, na=False)]
-                elif filter_conditions[c].get() == "Equals":
-                    filtered_data = filtered_data[filtered_data[c].astype(str) == filter_value]
-                elif filter_conditions[c].get() == "Range":
-                    try:
-                        min_val, max_val = map(float, filter_value.split("-"))
-                        filtered_data = filtered_data[(filtered_data[c].astype(float) >= min_val) & 
-                                                      (filtered_data[c].astype(float) <= max_val)]
-                    except ValueError:
-                        messagebox.showerror("Error", "Invalid range format. Use 'min-max'.")
-                        return
-
-        create_dynamic_grid(filtered_data)
+        filters = normalize_filters(filter_state)
+        try:
+            for c, condition, value in filters:
+                check_filter(condition, value)
+        except ValueError as e:
+            # A range or expression that is still being typed is not an error yet
+            if show_errors:
+                messagebox.showerror("Error", str(e))
+            return
+
+        filter_generation += 1
+        filter_running = None
+        row_ids = cached_filter(filters)
+        if row_ids is not None:
+            create_dynamic_grid(row_ids, keep_scroll)
+            return
+
+        # A filter that only narrows an earlier one is evaluated on the rows that survived it
+        base = refinement_base(filters)
+        filter_running = (filters, show_errors, keep_scroll)
+        threading.Thread(target=filter_worker, args=(filter_generation, filters, base, show_errors, keep_scroll),
+                         daemon=True).start()
     except Exception as e:
         messagebox.showerror("Error", str(e))
 
+# Runs in a worker thread and never touches Tk, the result is queued for the Tk thread
+def filter_worker(generation, filters, base, show_errors, keep_scroll):
+    cancelled = lambda: generation != filter_generation
+    try:
+        if base is not None:
+            predicates = compile_filters([f for f in filters if f not in base[0]])
+            row_ids = run_filters(predicates, base[1], cancelled)
+        else:
+            row_ids = run_filters(compile_filters(filters), None, cancelled)
+        filter_results.put((generation, filters, row_ids, None, show_errors, keep_scroll))
+    except Exception as e:
+        filter_results.put((generation, filters, None, e, show_errors, keep_scroll))
+
+# Pick up finished filters on the Tk thread, results of superseded requests are dropped
+def poll_filter_results():
+    global filter_running
+    while not filter_results.empty():
+        generation, filters, row_ids, error, show_errors, keep_scroll = filter_results.get()
+        if generation != filter_generation:
+            continue
+        filter_running = None
+        if error is not None:
+            if show_errors:
+                messagebox.showerror("Error", str(error))
+        elif row_ids is not None:
+            remember_filter(filters, row_ids)
+            create_dynamic_grid(row_ids, keep_scroll)
+    root.after(FILTER_POLL, poll_filter_results)
+
+# Forget any filter request still waiting or running
+def cancel_filters():
+    global filter_job, filter_generation, filter_running
+    if filter_job is not None:
+        root.after_cancel(filter_job)
+        filter_job = None
+    filter_generation += 1
+    filter_running = None
+
+# Column filters that are in use, as a sorted tuple of (column, condition, value)
+def normalize_filters(filters):
+    return tuple(sorted((c, condition, value.strip()) for c, (condition, value) in filters.items()
+                        if value.strip()))
+
+# Parse a range filter into inclusive (min, max): 'min-max' (either may be negative),
+# '>=min', '>min', '<=max' or '<max'. Strict bounds become the next float inside them
+def parse_range(filter_value):
+    match = RANGE_PATTERN.match(filter_value)
+    if match:
+        min_val, max_val = float(match.group(1)), float(match.group(2))
+        return min_val, max_val
+    match = BOUND_PATTERN.match(filter_value)
+    if not match:
+        raise ValueError(f"Invalid range '{filter_value}'. Use 'min-max', '>=min' or '<=max'.")
+    operator, bound = match.group(1), float(match.group(2))
+    if operator == ">=":
+        return bound, np.inf
+    if operator == ">":
+        return np.nextafter(bound, np.inf), np.inf
+    if operator == "<=":
+        return -np.inf, bound
+    return -np.inf, np.nextafter(bound, -np.inf)
+
+# Parse an expression filter into (negate, operator, argument), operators are normalized
+# to '>', '>=', '<', '<=', '=', '!=', 'startswith', 'endswith', 'contains', 'in', 'regex' or 'empty'
+def parse_expression(filter_value):
+    match = EXPRESSION_PATTERN.match(filter_value.strip())
+    if not match:
+        raise ValueError(f"Invalid expression '{filter_value}'. Start with an operator such as "
+                         "'>', '!=', 'startswith', 'in', 'is empty' or 'regex', optionally after 'not'.")
+    negate = match.group(1) is not None or match.group(2) is not None
+    operator = (match.group(3) or match.group(4)).lower()
+    operator = {"==": "=", "~": "regex"}.get(operator, operator)
+    if operator.startswith("is"):
+        operator = "empty"
+    argument = match.group(5).strip()
+
+    if operator == "empty":
+        if argument:
+            raise ValueError(f"'is empty' takes no value: {filter_value}")
+    elif not argument:
+        raise ValueError(f"'{operator}' needs a value: {filter_value}")
+    elif operator in (">", ">=", "<", "<="):
+        if not BOUND_PATTERN.match(operator + argument):
+            raise ValueError(f"'{operator}' needs a number: {filter_value}")
+    elif operator == "regex":
+        try:
+            compile_regex(argument)
+        except re.error as e:
+            raise ValueError(f"Invalid regex '{argument}': {e}")
+    return negate, operator, argument
+
+# Raise ValueError for a filter that cannot be compiled
+def check_filter(condition, filter_value):
+    if condition == "Range":
+        parse_range(filter_value)
+    elif condition == "Expression":
+        parse_expression(filter_value)
+
+# Regexes are compiled once and reused while the user edits other filters
+@lru_cache(maxsize=256)
+def compile_regex(pattern):
+    return re.compile(pattern)
+
+# True when every row kept by the new filters was also kept by the old ones
+def is_refinement(old_filters, new_filters):
+    return all(any(implies(new, old) for new in new_filters) for old in old_filters)
+
+# True when the filter new can only keep rows that the filter old keeps too
+def implies(new, old):
+    if new == old:
+        return True
+    (new_c, new_condition, new_value), (old_c, old_condition, old_value) = new, old
+    if new_c != old_c:
+        return False
+    if old_condition == "Contains" and new_condition in ("Contains", "Equals"):
+        return old_value in new_value
+    if old_condition == "Range" and new_condition == "Range":
+        new_min, new_max = parse_range(new_value)
+        old_min, old_max = parse_range(old_value)
+        return old_min <= new_min and new_max <= old_max
+    return False
+
+# Turn the column filters into functions that give a mask over a set of row ids
+def compile_filters(filters):
+    predicates = [compile_predicate(c, condition, value) for c, condition, value in filters]
+    return [predicate for predicate in predicates if predicate is not None]
+
+# Row ids of a filter set that was run before, marking it as recently used
+def cached_filter(filters):
+    if filters not in filter_cache:
+        return None
+    filter_cache.move_to_end(filters)
+    return filter_cache[filters]
+
+# Smallest cached result that the new filters only narrow down
+def refinement_base(filters):
+    bases = [(key, row_ids) for key, row_ids in filter_cache.items()
+             if len(row_ids) < len(full_data) and is_refinement(key, filters)]
+    return min(bases, key=lambda base: len(base[1]), default=None)
+
+# Keep a filter result, evicting the least recently used ones over the memory budget
+def remember_filter(filters, row_ids):
+    global filter_cache_bytes
+    row_ids.flags.writeable = False
+    filter_cache[filters] = row_ids
+    filter_cache_bytes += row_ids.nbytes
+    while filter_cache_bytes > FILTER_CACHE_BYTES and len(filter_cache) > 1:
+        filter_cache_bytes -= filter_cache.popitem(last=False)[1].nbytes
+
+# Evaluate code lookups over row partitions in a process pool. The codes are put in
+# shared memory once per column and the lookup tables once per run, only their names are pickled
+def run_parallel(lookups, cancelled=None):
+    pool = get_process_pool()
+    blocks = [copy_to_shared(hits) for c, codes, hits in lookups]
+    try:
+        tables = [(shared_array(c, codes), (block.name, hits.dtype.str, len(hits)))
+                  for (c, codes, hits), block in zip(lookups, blocks)]
+        step = max(1, -(-len(full_data) // (4 * os.cpu_count())))
+        futures = [pool.submit(filter_partition, tables, start, min(start + step, len(full_data)))
+                   for start in range(0, len(full_data), step)]
+
+        pending = set(futures)
+        while pending:
+            if cancelled is not None and cancelled():
+                for future in pending:
+                    future.cancel()
+                return None
+            done, pending = wait(pending, timeout=0.1)
+        return np.concatenate([future.result() for future in futures])
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+# Worker processes shared by filtering and CSV parsing, started on first use
+def get_process_pool():
+    global process_pool
+    if process_pool is None:
+        process_pool = ProcessPoolExecutor(max_workers=os.cpu_count(),
+                                           mp_context=multiprocessing.get_context("spawn"))
+    return process_pool
+
+# Close the window without waiting for the partitions still queued in the pool, otherwise
+# closing during a parallel parse would keep Python running until every one has finished
+def close_window():
+    cancel_load()
+    cancel_filters()
+    if process_pool is not None:
+        process_pool.shutdown(wait=False, cancel_futures=True)
+    root.destroy()
+
+# Runs in a worker process: row ids in [start, stop) whose codes hit every lookup table
+def filter_partition(tables, start, stop):
+    mask = np.ones(stop - start, dtype=bool)
+    for (name, dtype, length), (hits_name, hits_dtype, hits_length) in tables:
+        block = shared_memory.SharedMemory(name=name)
+        hits_block = shared_memory.SharedMemory(name=hits_name)
+        codes = np.ndarray((length,), dtype=dtype, buffer=block.buf)
+        hits = np.ndarray((hits_length,), dtype=hits_dtype, buffer=hits_block.buf)
+        mask &= hits[codes[start:stop]]
+        del codes, hits
+        block.close()
+        hits_block.close()
+        if not mask.any():
+            break
+    return np.flatnonzero(mask) + start
+
+# Check the distinct texts of column c with the given sorted ids (all of them when ids is None)
+# against a text operator. Many texts are split into ranges checked by the process pool,
+# each reading its range from shared memory
+def match_distinct(c, ids, operator, argument):
+    uniques = column_distinct(c)[1]
+    count = len(uniques) if ids is None else len(ids)
+    name, starts = (None, None)
+    if count >= PARALLEL_MIN_VALUES and os.cpu_count() > 1:
+        name, starts = shared_strings(c, uniques)
+    if name is None:
+        return match_values(uniques if ids is None else uniques[ids], operator, argument)
+
+    futures = list()
+    bounds = np.linspace(0, len(uniques), 4 * os.cpu_count() + 1).astype(np.int64)
+    for first, last in zip(bounds[:-1], bounds[1:]):
+        local = None
+        if ids is not None:
+            local = ids[np.searchsorted(ids, first):np.searchsorted(ids, last)] - first
+            if len(local) == 0:
+                continue
+        if last > first:
+            futures.append(get_process_pool().submit(text_partition, name, int(starts[first]),
+                                                     int(starts[last]) - 1, operator, argument, local))
+    return np.concatenate([np.zeros(0, dtype=bool)] + [future.result() for future in futures])
+
+# Runs in a worker process: check the texts in bytes [start, stop) of a shared block
+# (those at the local ids when given) against a text operator
+def text_partition(name, start, stop, operator, argument, ids):
+    block = shared_memory.SharedMemory(name=name)
+    text = bytes(block.buf[start:stop]).decode("utf-8", errors="surrogatepass")
+    block.close()
+    values = text.split("\x00")
+    if ids is not None:
+        values = [values[i] for i in ids]
+    return match_values(values, operator, argument)
+
+# Which texts match 'contains', 'startswith', 'endswith' or 'regex' with argument
+def match_values(values, operator, argument):
+    if operator == "contains":
+        matches = (argument in value for value in values)
+    elif operator == "startswith":
+        matches = (value.startswith(argument) for value in values)
+    elif operator == "endswith":
+        matches = (value.endswith(argument) for value in values)
+    else:
+        # The compiled pattern is applied directly, pandas would warn about match groups
+        search = compile_regex(argument).search
+        matches = (search(value) is not None for value in values)
+    return np.fromiter(matches, dtype=bool, count=len(values))
+
+# New shared memory block holding a copy of an array
+def copy_to_shared(values):
+    block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)[:] = values
+    return block
+
+# Shared blocks are kept per column, kind and the array they copy: a filter thread still
+# holding codes from before an edit or a new dataset gets a block of its own, never the
+# current one. Blocks of arrays that are gone are freed, their ids may be reused
+def shared_entry(c, kind, values, make):
+    key = (c, kind, id(values))
+    with shared_lock:
+        for old in [old for old, entry in shared_blocks.items() if entry[1]() is None]:
+            block = shared_blocks.pop(old)[0]
+            if block is not None:
+                block.close()
+                block.unlink()
+        entry = shared_blocks.get(key)
+        if entry is None:
+            block, extra = make(values)
+            shared_blocks[key] = entry = (block, weakref.ref(values), extra)
+        return entry[0], entry[2]
+
+# Shared memory copy of a column's codes: (name, dtype, length) for the workers
+def shared_array(c, values):
+    block, extra = shared_entry(c, "codes", values, lambda values: (copy_to_shared(values), None))
+    return block.name, values.dtype.str, len(values)
+
+# Shared memory copy of a column's distinct texts as UTF-8 joined by NUL, with the byte offset
+# where each text starts (and one past the end). (None, None) if a text holds a NUL itself
+def shared_strings(c, uniques):
+    block, starts = shared_entry(c, "strings", uniques, join_strings)
+    return (None, None) if block is None else (block.name, starts)
+
+def join_strings(uniques):
+    joined = "\x00".join(uniques)
+    if joined.count("\x00") != max(len(uniques) - 1, 0):
+        return None, None
+    data = joined.encode("utf-8", errors="surrogatepass")
+    if len(data) == len(joined):
+        lengths = np.fromiter(map(len, uniques), dtype=np.int64, count=len(uniques))
+    else:
+        sizes = (len(value.encode("utf-8", errors="surrogatepass")) for value in uniques)
+        lengths = np.fromiter(sizes, dtype=np.int64, count=len(uniques))
+    block = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+    block.buf[:len(data)] = data
+    return block, np.r_[0, np.cumsum(lengths + 1)]
+
+# Free the shared memory of column c (of every column when c is None)
+def release_shared(c=None):
+    with shared_lock:
+        for key in [key for key in shared_blocks if c is None or key[0] == c]:
+            block = shared_blocks.pop(key)[0]
+            if block is not None:
+                block.close()
+                block.unlink()
+
+# Drop cached filter results that read column c (all of them when c is None)
+def forget_filter_results(c=None):
+    global filter_cache_bytes, filter_generation, filter_running
+
+    # A filter still running on the old data is dropped too. After an edit only one that reads
+    # the edited column is, and it is started again; callers replacing the data start their own
+    if filter_running is not None:
+        filters, show_errors, keep_scroll = filter_running
+        if c is None or any(column == c for column, condition, value in filters):
+            filter_generation += 1
+            filter_running = None
+            if c is not None:
+                start_filter(show_errors, keep_scroll)
+    for filters in list(filter_cache):
+        if c is None or any(column == c for column, condition, value in filters):
+            filter_cache_bytes -= filter_cache.pop(filters).nbytes
+
+# Predicates read the typed column store, ids=None stands for every row
+def compile_predicate(c, condition, filter_value):
+    if condition == "Contains":
+        # Plain text is looked up once per distinct value, then mapped to rows by code
+        return lookup_predicate(c, contains_hits(c, filter_value))
+    if condition == "Equals":
+        return equals_predicate(c, filter_value)
+    if condition == "Range":
+        return range_predicate(c, *parse_range(filter_value))
+    if condition == "Expression":
+        return compile_expression(c, filter_value)
+    return None
+
+# Compile an expression filter. Comparisons use the sorted column, equality the hash index
+# and text operators are evaluated once per distinct value
+def compile_expression(c, filter_value):
+    negate, operator, argument = parse_expression(filter_value)
+    if operator in (">", ">=", "<", "<="):
+        predicate = range_predicate(c, *parse_range(operator + argument))
+    elif operator in ("=", "!="):
+        predicate = equals_predicate(c, argument)
+        negate = negate != (operator == "!=")
+    else:
+        predicate = lookup_predicate(c, text_hits(c, operator, argument))
+
+    if not negate:
+        return predicate
+    if hasattr(predicate, "lookup"):
+        return lookup_predicate(c, ~predicate.lookup[2])
+    return lambda ids: ~predicate(ids)
+
+# Predicate that maps each row's code through a table of hits per distinct value
+def lookup_predicate(c, hits):
+    codes = column_distinct(c)[0]
+    predicate = lambda ids: hits[take(codes, ids)]
+    predicate.lookup = (c, codes, hits)
+    return predicate
+
+# The hash index gives the code of the value and the rows holding it
+def equals_predicate(c, text):
+    codes = column_distinct(c)[0]
+    code, rows = equal_rows(c, text)
+    predicate = lambda ids: take(codes, ids) == code
+    predicate.row_ids = rows
+    return predicate
+
+# Two binary searches in the sorted column give the rows inside [min_val, max_val]
+def range_predicate(c, min_val, max_val):
+    order, sorted_numbers = column_sorted(c)
+    first = np.searchsorted(sorted_numbers, min_val, side="left")
+    last = np.searchsorted(sorted_numbers, max_val, side="right")
+    hits = np.zeros(len(order), dtype=bool)
+    hits[order[first:last]] = True
+    predicate = lambda ids: take(hits, ids)
+    predicate.row_ids = np.sort(order[first:last])
+    return predicate
+
+def take(values, ids):
+    return values if ids is None else values[ids]
+
+# Evaluate all predicates as one plan: the most selective one runs first and each
+# following one only looks at the rows still left, stopping as soon as none are.
+# row_ids limits the plan to rows already known to pass (refining the last filter),
+# cancelled is checked between predicates and stops the plan with None
+def run_filters(predicates, row_ids=None, cancelled=None):
+    if not predicates:
+        return np.arange(len(full_data)) if row_ids is None else row_ids
+
+    # Selectivity is estimated on an evenly spread sample of the rows
+    candidates = np.arange(len(full_data)) if row_ids is None else row_ids
+    sample = candidates[np.linspace(0, len(candidates) - 1, min(len(candidates), SAMPLE_ROWS)).astype(np.int64)]
+    predicates = sorted(predicates, key=lambda predicate: selectivity(predicate, sample))
+
+    # Very large sheets without an index to start from scan in worker processes
+    if (row_ids is None and len(full_data) >= PARALLEL_MIN_ROWS
+            and not any(hasattr(predicate, "row_ids") for predicate in predicates)):
+        lookups = [predicate.lookup for predicate in predicates if hasattr(predicate, "lookup")]
+        if lookups:
+            row_ids = run_parallel(lookups, cancelled)
+            if row_ids is None:
+                return None
+            predicates = [predicate for predicate in predicates if not hasattr(predicate, "lookup")]
+
+    for predicate in predicates:
+        if cancelled is not None and cancelled():
+            return None
+        if row_ids is None and hasattr(predicate, "row_ids"):
+            # Index lookups already know their rows, no mask over the whole column is needed
+            row_ids = predicate.row_ids
+        else:
+            mask = predicate(row_ids)
+            row_ids = np.flatnonzero(mask) if row_ids is None else row_ids[mask]
+        if len(row_ids) == 0:
+            break
+    return row_ids
+
+# Share of rows a predicate is expected to keep. Index lookups know their rows and code
+# lookups on categories are counted from the profile, others are tried on the sample
+def selectivity(predicate, sample):
+    if hasattr(predicate, "row_ids"):
+        return len(predicate.row_ids) / max(1, len(full_data))
+    if hasattr(predicate, "lookup"):
+        c, codes, hits = predicate.lookup
+        counts = column_profile(c)["counts"]
+        if counts is not None and len(counts) == len(hits):
+            return counts[hits].sum() / max(1, len(full_data))
+    return np.count_nonzero(predicate(sample)) / max(1, len(sample))
+
 # Clear filters
 def clear_filters():
-    for entry in filter_entries:
-        entry.delete(0, tk.END)
-    create_dynamic_grid(full_data)
+    cancel_filters()
+    filter_state.clear()
+    create_dynamic_grid(all_rows())
+
+# Sort by column c alone, or with add (Shift-click) as one more key after the current ones.
+# Each click moves the column from unsorted to ascending, descending and back to unsorted
+def toggle_sort(c, add=False):
+    global sort_keys
+    if refuse_mapped():
+        return
+    ascending = dict(sort_keys).get(c)
+    key = (c, True) if ascending is None else (c, False) if ascending else None
+    if not add:
+        sort_keys = [key] if key else []
+    elif ascending is None:
+        sort_keys.append(key)
+    else:
+        i = [column for column, direction in sort_keys].index(c)
+        sort_keys[i:i + 1] = [key] if key else []
+    create_dynamic_grid(filter_rows)
+
+# Order filtered row ids by the sort keys, ties keep their order in full_data
+def sort_rows(row_ids):
+    if not sort_keys:
+        return row_ids
+    if len(sort_keys) == 1:
+        # The column's cached permutation, keeping only the rows that passed the filters
+        order = column_order(*sort_keys[0])
+        if len(row_ids) == len(full_data):
+            return order
+        keep = np.zeros(len(full_data), dtype=bool)
+        keep[row_ids] = True
+        return order[keep[order]]
+
+    # np.lexsort sorts by its last key first, cells without a value go last in either direction
+    keys = list()
+    for c, ascending in reversed(sort_keys):
+        ranks, missing = column_ranks(c)
+        keys.append(ranks[row_ids] if ascending else -ranks[row_ids])
+        keys.append(missing[row_ids])
+    return row_ids[np.lexsort(keys)]
+
+# Typed column store of a dataset with each column's profile, inferring each column's type once.
+# Loads build it in their worker thread
+def build_store(data):
+    store = [infer_column(data[c]) for c in data.columns]
+    for c, column in zip(data.columns, store):
+        column["profile"] = build_profile(column, data[c])
+    return store
+
+# Swap in a dataset together with its column store, so filter threads never see one without the other
+def swap_column_store(data, store):
+    global full_data, column_store
+    with store_lock:
+        full_data, column_store = data, store
+    release_shared()
+
+# Column of the store, rebuilt with its profile if an edit has thrown it away. Filter threads
+# type columns outside the lock and keep the result only if no edit or new dataset came in
+# meanwhile, the Tk thread then only reads the profile for the filter header
+def get_column(c):
+    with store_lock:
+        store, data, edits = column_store, full_data, store_edits
+        column = store[c]
+    if column is None:
+        column = infer_column(data[c])
+        column["profile"] = build_profile(column, data[c])
+        with store_lock:
+            if store is column_store and edits == store_edits and store[c] is None:
+                store[c] = column
+    return column
+
+# Work out the type of a column (int, float, datetime, category or text) and keep native values
+def infer_column(series):
+    present = series.notna().to_numpy()
+    column = {"kind": "text", "present": present, "valid": present, "strings": None, "numbers": None,
+              "distinct": None, "trigrams": None, "sorted": None, "equals": None,
+              "ranks": None, "orders": dict(), "profile": None}
+
+    # With header=None the header text sits in the first row, so one odd value is allowed
+    if pd.api.types.is_bool_dtype(series.dtype):
+        pass
+    elif pd.api.types.is_integer_dtype(series.dtype):
+        column.update(kind="int", values=series.to_numpy(dtype=np.int64))
+        return column
+    elif pd.api.types.is_float_dtype(series.dtype):
+        column.update(kind="float", values=series.to_numpy(dtype=float))
+        return column
+    elif (pd.api.types.is_datetime64_any_dtype(series.dtype)
+          or pd.api.types.infer_dtype(series[present][1:], skipna=True) in ("datetime", "datetime64", "date")):
+        dates = pd.to_datetime(series, errors="coerce", format="mixed")
+        valid = dates.notna().to_numpy()
+        if valid.sum() >= present.sum() - 1:
+            column.update(kind="datetime", values=dates.to_numpy(dtype="datetime64[ns]"), valid=valid)
+            return column
+    else:
+        numbers = pd.to_numeric(series, errors="coerce").to_numpy(dtype=float)
+        valid = ~np.isnan(numbers)
+        if valid.any() and valid.sum() >= present.sum() - 1:
+            whole = numbers[valid]
+            if np.all(whole == np.round(whole)) and np.abs(whole).max() < 2 ** 53:
+                column.update(kind="int", values=np.where(valid, numbers, 0).astype(np.int64), valid=valid)
+            else:
+                column.update(kind="float", values=numbers, valid=valid)
+            return column
+
+        # Dates stored as text, as CSV files hold them
+        dates = text_dates(series, present)
+        if dates is not None:
+            valid = dates.notna().to_numpy()
+            if valid.sum() >= present.sum() - 1:
+                column.update(kind="datetime", values=dates.to_numpy(dtype="datetime64[ns]"), valid=valid)
+                return column
+
+    # Strings with few distinct values keep factorized codes and their labels
+    codes, uniques = pd.factorize(series)
+    if len(uniques) <= CATEGORY_RATIO * len(series):
+        column.update(kind="category", values=codes, categories=np.asarray(uniques, dtype=object))
+    else:
+        column.update(values=series.to_numpy(dtype=object))
+    return column
+
+# Summary of a column: type, empty cells, min/max, distinct count and most frequent values.
+# Built with the store at load time, and again on first use after an edit
+def column_profile(c):
+    column = get_column(c)
+    if column["profile"] is None:
+        column["profile"] = build_profile(column, full_data[c])
+    return column["profile"]
+
+# Profile of a typed column, series is the column as loaded. The texts offered by the filter
+# dropdown are kept with it, so opening a dropdown builds nothing on the Tk thread
+def build_profile(column, series):
+    present = column["valid"] if column["kind"] in ("int", "float", "datetime") else column["present"]
+    values = column["values"][present]
+    profile = {"kind": column["kind"], "rows": len(present), "empty": int(np.count_nonzero(~present)),
+               "min": None, "max": None, "counts": None}
+
+    if column["kind"] == "category":
+        # Codes give exact counts per category, the last slot counts the missing cells
+        counts = np.bincount(values, minlength=len(column["categories"]))
+        profile["counts"] = np.r_[counts, profile["empty"]]
+        top = np.argsort(-counts, kind="stable")[:PROFILE_TOP]
+        profile["top"] = [(column["categories"][code], int(counts[code])) for code in top if counts[code]]
+        profile["distinct"], profile["exact"] = int(np.count_nonzero(counts)), True
+
+        # Categories such as 1 and "1" share one text
+        totals = pd.Series(counts).groupby([str(value) for value in column["categories"]], sort=False).sum()
+        choices = totals[totals > 0].sort_values(ascending=False, kind="stable").index
+    else:
+        # Top values come from an evenly spread sample, scaled up to the whole column
+        sample = values[np.linspace(0, len(values) - 1, min(len(values), PROFILE_SAMPLE)).astype(np.int64)]
+        top = pd.Series(sample).value_counts().head(PROFILE_TOP)
+        scale = len(values) / max(1, len(sample))
+        profile["top"] = [(value, int(round(count * scale))) for value, count in top.items()]
+        profile["distinct"], profile["exact"] = approx_distinct(values), False
+        if column["kind"] != "text" and len(values):
+            profile["min"], profile["max"] = values.min(), values.max()
+
+        # Texts of the cells as the Equals filter reads them, counted on a sample of the rows
+        rows = np.flatnonzero(column["present"])
+        rows = rows[np.linspace(0, len(rows) - 1, min(len(rows), PROFILE_SAMPLE)).astype(np.int64)]
+        choices = series.iloc[rows].astype(str).value_counts().index
+    profile["choices"] = [text for text in choices[:DROPDOWN_VALUES + 1] if text != ""][:DROPDOWN_VALUES]
+    return profile
+
+# HyperLogLog estimate of the number of distinct values, from one hash per value
+def approx_distinct(values):
+    if len(values) == 0:
+        return 0
+    hashes = pd.util.hash_array(np.asarray(values))
+    registers = 1 << PROFILE_BITS
+    index = (hashes >> np.uint64(64 - PROFILE_BITS)).astype(np.int64)
+    rest = (hashes & np.uint64((1 << (64 - PROFILE_BITS)) - 1)).astype(float)
+
+    # Position of the first set bit of the remaining bits, frexp gives their bit length exactly
+    first_bit = (64 - PROFILE_BITS) - np.frexp(rest)[1] + 1
+    maxima = np.zeros(registers, dtype=np.int64)
+    np.maximum.at(maxima, index, first_bit)
+
+    estimate = 0.7213 / (1 + 1.079 / registers) * registers ** 2 / np.sum(2.0 ** -maxima)
+    empty = np.count_nonzero(maxima == 0)
+    if estimate <= 2.5 * registers and empty:
+        # Few values: linear counting over the registers that stayed empty is more accurate
+        estimate = registers * np.log(registers / empty)
+    return int(round(estimate))
+
+# A text column parsed as dates, or None when a sample of it (without the header row) is not dates.
+# Only a format guessed from the sample with a year in it counts: times, scores such as 1/2,
+# month names or words such as "today" are left as text. It parses the whole column at once
+def text_dates(series, present):
+    values = series[present].iloc[1:]
+    if len(values) == 0:
+        return None
+    sample = values.iloc[np.linspace(0, len(values) - 1, min(len(values), DATE_SAMPLE)).astype(np.int64)]
+    if pd.api.types.infer_dtype(sample, skipna=True) != "string":
+        return None
+    date_format = guess_datetime_format(str(sample.iloc[-1]))
+    if date_format is None or not ("%Y" in date_format or "%y" in date_format):
+        return None
+    parsed = pd.to_datetime(sample, errors="coerce", format=date_format)
+    if parsed.notna().sum() < len(sample) - 1:
+        return None
+    return pd.to_datetime(series, errors="coerce", format=date_format)
+
+# Text of every cell in a column (as astype(str), empty for missing), built on first use
+def column_strings(c):
+    column = get_column(c)
+    if column["strings"] is None:
+        if column["kind"] == "category":
+            # Code -1 (missing) picks the empty label at the end
+            labels = np.array([str(value) for value in column["categories"]] + [""], dtype=object)
+            strings = labels[column["values"]]
+        else:
+            strings = np.array(full_data[c].astype(str), dtype=object)
+            strings[~column["present"]] = ""
+        column["strings"] = strings
+    return column["strings"]
+
+# Numbers of a column as floats, NaN where a cell is not a number, built on first use
+def column_numbers(c):
+    column = get_column(c)
+    if column["numbers"] is None:
+        if column["kind"] in ("int", "float"):
+            column["numbers"] = np.where(column["valid"], column["values"], np.nan).astype(float)
+        else:
+            column["numbers"] = pd.to_numeric(full_data[c], errors="coerce").to_numpy(dtype=float)
+    return column["numbers"]
+
+# Row ids of a column ordered by their numbers (NaN last) and the numbers in that order
+def column_sorted(c):
+    column = get_column(c)
+    if column["sorted"] is None:
+        numbers = column_numbers(c)
+        order = np.argsort(numbers, kind="stable")
+        column["sorted"] = (order, numbers[order])
+    return column["sorted"]
+
+# Place of each row in the column's order by its type (equal values share a place) and the
+# rows without a value of that type, which sort last. Built on first use
+def column_ranks(c):
+    column = get_column(c)
+    if column["ranks"] is None:
+        if column["kind"] in ("int", "float", "datetime"):
+            values, missing = column["values"], ~column["valid"] | pd.isna(column["values"])
+        else:
+            # Texts are compared once per distinct value, rows take the place of their text
+            codes, uniques = column_distinct(c)
+            places = np.empty(len(uniques), dtype=np.int64)
+            places[np.argsort(uniques, kind="stable")] = np.arange(len(uniques))
+            values, missing = np.where(codes >= 0, places[codes], 0), ~column["present"]
+
+        order = np.argsort(values, kind="stable")
+        ordered = values[order]
+        ranks = np.empty(len(values), dtype=np.int64)
+        ranks[order] = np.cumsum(np.r_[False, ordered[1:] != ordered[:-1]])
+        ranks[missing] = 0
+        column["ranks"] = (ranks, missing)
+    return column["ranks"]
+
+# Permutation of all rows sorting column c ascending or descending, built once per direction
+def column_order(c, ascending):
+    column = get_column(c)
+    if ascending not in column["orders"]:
+        ranks, missing = column_ranks(c)
+        order = np.lexsort((ranks if ascending else -ranks, missing))
+        order.flags.writeable = False
+        column["orders"][ascending] = order
+    return column["orders"][ascending]
+
+# Distinct texts of a column and the code of each row into them (-1 for missing), built on first use
+def column_distinct(c):
+    column = get_column(c)
+    if column["distinct"] is None:
+        if column["kind"] == "category":
+            # Categories such as 1 and "1" have the same text, their codes are merged
+            texts = np.array([str(value) for value in column["categories"]], dtype=object)
+            label_codes, labels = pd.factorize(texts)
+            codes = column["values"]
+            if len(labels) < len(label_codes):
+                codes = np.where(codes >= 0, label_codes[codes], -1)
+            column["distinct"] = (codes, np.asarray(labels, dtype=object))
+        else:
+            codes, uniques = pd.factorize(column_strings(c))
+            column["distinct"] = (codes, np.asarray(uniques, dtype=object))
+    return column["distinct"]
+
+# Hash index from each distinct text of a column to the rows holding it, built on first use:
+# the text lookup table, the row ids grouped by code and where each code's group starts
+def column_equals(c):
+    column = get_column(c)
+    if column["equals"] is None:
+        codes, uniques = column_distinct(c)
+        order = np.argsort(codes, kind="stable")
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        starts = np.r_[0, np.cumsum(counts)] + np.count_nonzero(codes < 0)
+        column["equals"] = (pd.Index(uniques), order, starts)
+    return column["equals"]
+
+# Code of a text in a column (-2 if it does not occur) and the rows holding it
+def equal_rows(c, text):
+    lookup, order, starts = column_equals(c)
+    code = lookup.get_indexer([text])[0]
+    if code < 0:
+        return -2, np.zeros(0, dtype=np.int64)
+    return code, order[starts[code]:starts[code + 1]]
+
+# Most frequent distinct texts of a column, for the filter dropdowns. They come with the
+# profile, an edited column offers none until a filter thread has typed it again
+def distinct_values(c):
+    if c is None or c >= len(column_store) or column_store[c] is None or column_store[c]["profile"] is None:
+        return []
+    return column_store[c]["profile"]["choices"]
+
+# Trigram index over the distinct texts of a column, built the first time it is searched
+def column_trigrams(c):
+    column = get_column(c)
+    if column["trigrams"] is None:
+        column["trigrams"] = build_trigram_index(column_distinct(c)[1])
+    return column["trigrams"]
+
+# Posting lists from each trigram to the distinct values containing it. Values longer than
+# INDEX_MAX_CHARS are not indexed and are always checked directly
+def build_trigram_index(uniques):
+    lengths = np.fromiter(map(len, uniques), dtype=np.int64, count=len(uniques))
+    indexed = np.flatnonzero(lengths <= INDEX_MAX_CHARS)
+
+    all_keys, all_ids = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+    for start in range(0, len(indexed), INDEX_BLOCK):
+        ids = indexed[start:start + INDEX_BLOCK]
+        width = max(3, int(lengths[ids].max()))
+
+        # Every character as its code point, padded with zeros to the longest value of the block
+        chars = np.array(uniques[ids].tolist(), dtype=f"<U{width}").view(np.uint32)
+        chars = chars.reshape(len(ids), width).astype(np.int64)
+        first, second, third = chars[:, :-2], chars[:, 1:-1], chars[:, 2:]
+        keys = (first << 42) | (second << 21) | third
+        real = (first > 0) & (second > 0) & (third > 0)
+        all_keys.append(keys[real])
+        all_ids.append(np.broadcast_to(ids[:, None], keys.shape)[real])
+
+    # One posting per (trigram, value), grouped by trigram
+    keys, ids = np.concatenate(all_keys), np.concatenate(all_ids)
+    order = np.lexsort((ids, keys))
+    keys, ids = keys[order], ids[order]
+    new = np.ones(len(keys), dtype=bool)
+    new[1:] = (keys[1:] != keys[:-1]) | (ids[1:] != ids[:-1])
+    keys, ids = keys[new], ids[new]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.zeros(0, dtype=np.int64)
+    return {"keys": keys[starts], "starts": np.r_[starts, len(keys)], "ids": ids,
+            "unindexed": np.flatnonzero(lengths > INDEX_MAX_CHARS)}
+
+# Distinct values that may contain text: the intersection of its trigrams' posting lists
+def trigram_candidates(index, text):
+    codes = [ord(char) for char in text]
+    postings = list()
+    for key in {(a << 42) | (b << 21) | c for a, b, c in zip(codes, codes[1:], codes[2:])}:
+        i = np.searchsorted(index["keys"], key)
+        if i == len(index["keys"]) or index["keys"][i] != key:
+            return index["unindexed"]
+        postings.append(index["ids"][index["starts"][i]:index["starts"][i + 1]])
+
+    postings.sort(key=len)
+    candidates = postings[0]
+    for posting in postings[1:]:
+        candidates = np.intersect1d(candidates, posting, assume_unique=True)
+        if len(candidates) == 0:
+            break
+    return np.concatenate([candidates, index["unindexed"]])
+
+# Which distinct values of a column contain text, with one extra False slot for code -1
+def contains_hits(c, text):
+    codes, uniques = column_distinct(c)
+    hits = np.zeros(len(uniques) + 1, dtype=bool)
+    if len(text) >= 3 and len(uniques) >= INDEX_MIN_VALUES:
+        # Candidates are verified, the trigrams only rule values out
+        candidates = np.sort(trigram_candidates(column_trigrams(c), text))
+        hits[candidates[match_distinct(c, candidates, "contains", text)]] = True
+    else:
+        hits[:-1] = match_distinct(c, None, "contains", text)
+    return hits
+
+# Which distinct values of a column match a text operator, with one extra slot for code -1
+def text_hits(c, operator, argument):
+    if operator == "contains":
+        return contains_hits(c, argument)
+    codes, uniques = column_distinct(c)
+    hits = np.zeros(len(uniques) + 1, dtype=bool)
+    if operator in ("startswith", "endswith", "regex"):
+        hits[:-1] = match_distinct(c, None, operator, argument)
+    elif operator == "in":
+        items = [item.strip() for item in argument.split(",")]
+        hits[:-1] = pd.Index(uniques).isin(items)
+    elif operator == "empty":
+        # Missing cells are empty too, whether they have code -1 or the empty text
+        hits[:-1] = uniques == ""
+        hits[-1] = True
+    return hits
 
 # Highlight selected cells/rows/columns
 def highlight_cells_or_rows():
@@ -91,85 +1554,429 @@ def highlight_cells_or_rows():
         if not color:
             return
 
-        # Highlight based on the mode selected (Cell, Row, Column)
+        # Highlights are kept by row of full_data so they survive filtering
         if highlight_mode.get() == "Cell" and selected_cell:
             r, c = selected_cell
-            grid[r][c].config(bg=color)
-            highlighted_cells.add((r, c))
+            highlighted_cells[(int(view_rows[r]), c)] = color
 
         elif highlight_mode.get() == "Row" and selected_row is not None:
-            for c in range(cols):
-                grid[selected_row][c].config(bg=color)
-            highlighted_rows.add(selected_row)
+            highlighted_rows[int(view_rows[selected_row])] = color
 
         elif highlight_mode.get() == "Column" and selected_col is not None:
-            for r in range(rows):
-                grid[r][selected_col].config(bg=color)
-            highlighted_columns.add(selected_col)
+            highlighted_columns[selected_col] = color
+
+        refresh_cells()
 
     except Exception as e:
         messagebox.showerror("Error", str(e))
 
 # Reset Highlight (Remove all highlights)
 def reset_highlight():
-    global highlighted_cells, highlighted_rows, highlighted_columns
-
-    # Reset highlighted cells
-    for r, c in highlighted_cells:
-        grid[r][c].config(bg="white")
     highlighted_cells.clear()
-
-    # Reset highlighted rows
-    for r in highlighted_rows:
-        for c in range(cols):
-            grid[r][c].config(bg="white")
     highlighted_rows.clear()
-
-    # Reset highlighted columns
-    for c in highlighted_columns:
-        for r in range(rows):
-            grid[r][c].config(bg="white")
     highlighted_columns.clear()
+    refresh_cells()
+
+# Background of a grid cell: cell, then row and column highlights
+def cell_color(r, c):
+    row = int(view_rows[r])
+    return (highlighted_cells.get((row, c)) or highlighted_rows.get(row)
+            or highlighted_columns.get(c) or "white")
+
+# Repaint the background of the cells on screen
+def refresh_cells():
+    for (r, c), (rect, text) in grid.items():
+        canvas.itemconfigure(rect, fill=cell_color(r, c))
+
+# Create a dynamic grid with scrolling, showing the given rows of full_data
+def create_dynamic_grid(row_ids, keep_scroll=False):
+    global rows, cols, view_rows, filter_rows, grid, top_row
+    global selected_cell, selected_row, selected_col, editing_cell
+    rows, cols = len(row_ids), full_data.shape[1] if mapped_file is None else mapped_file["columns"]
+    old_rows = view_rows
 
-# Create a dynamic grid with scrolling
-def create_dynamic_grid(data):
-    global rows, cols, grid
-    rows, cols = data.shape
+    # The grid is a view of full_data through these row ids in sort order, nothing is copied
+    filter_rows = row_ids
+    view_rows = sort_rows(row_ids)
 
-    # Clear the canvas and grid frame
-    for widget in canvas_frame.winfo_children():
-        widget.destroy()
+    # Keep the canvas items of the previous grid, they are redrawn for the new rows
+    for items in grid.values():
+        for item in items:
+            canvas.itemconfigure(item, state="hidden", tags="")
+    cell_pool.extend(grid.values())
+    grid = dict()
 
-    # Add the new grid
-    grid = [[tk.Entry(canvas_frame, width=15, font=("Arial", 10)) for c in range(cols)] for r in range(rows)]
-    for r, row in enumerate(data.values):
-        for c, value in enumerate(row):
-            entry = grid[r][c]
-            entry.insert(0, value)
-            entry.grid(row=r, column=c, sticky="nsew", padx=5, pady=5)
+    # The view stays where it was when rows were only added
+    if not keep_scroll:
+        canvas.xview_moveto(0)
+        top_row = 0
+    top_row = min(top_row, max(0, rows - screen_rows()))
 
-            # Bind mouse click event to capture row, column, or cell
-            entry.bind("<Button-1>", lambda event, r=r, c=c: on_cell_click(event, r, c))
+    # When rows were only added the selection and an open editor follow the rows they were on
+    selected = moved_row(old_rows, selected_cell) if keep_scroll else None
+    if selected is None:
+        selected_cell = selected_row = selected_col = None
+    else:
+        selected_cell, selected_row = (selected, selected_cell[1]), selected
+    edited = moved_row(old_rows, editing_cell) if keep_scroll else None
+    if edited is None:
+        cancel_edit()
+    else:
+        editing_cell = (edited, editing_cell[1])
+        canvas.coords(editor_item, editing_cell[1] * COL_WIDTH, window_y(edited))
+    draw_selection()
 
-    # Update canvas scroll region after the grid is created
-    canvas_frame.update_idletasks()
-    canvas.config(scrollregion=canvas.bbox("all"))
+    # The canvas scrolls only sideways, over all columns. Rows scroll by number (top_row) and are
+    # drawn relative to the top one: Tk keeps canvas coordinates in C ints, which a scroll region
+    # of every row would overflow on tall sheets
+    canvas.config(scrollregion=(0, 0, cols * COL_WIDTH, 0))
 
     # Create dynamic filter entries based on the number of columns
     update_filter_entries(cols)
+    render_viewport()
+
+# Position in view_rows of the row that a cell of the old_rows view was on, None if it is not shown
+def moved_row(old_rows, cell):
+    if cell is None or cell[0] >= len(old_rows) or cell[1] >= cols:
+        return None
+    positions = np.flatnonzero(view_rows == old_rows[cell[0]])
+    return int(positions[0]) if len(positions) else None
+
+# Draw the cells inside the visible part of the canvas
+def render_viewport(event=None):
+    global render_job, pending_cells
+    if render_job is not None:
+        root.after_cancel(render_job)
+        render_job = None
+
+    left = canvas.canvasx(0)
+    first_row = top_row
+    last_row = min(rows, top_row + canvas.winfo_height() // ROW_HEIGHT + 1)
+    if rows:
+        scroll_y.set(first_row / rows, last_row / rows)
+    else:
+        scroll_y.set(0, 1)
+    first_col = max(0, int(left // COL_WIDTH))
+    last_col = min(cols, int((left + canvas.winfo_width()) // COL_WIDTH) + 1)
+    render_filter_entries(first_col, last_col)
+
+    # One screen above and below is drawn in the background so short scrolls find it ready
+    screen_rows = last_row - first_row
+    ahead_first = max(0, first_row - screen_rows)
+    ahead_last = min(rows, last_row + screen_rows)
+    ahead = {(r, c) for r in range(ahead_first, ahead_last) for c in range(first_col, last_col)}
+
+    # Cells that scrolled out of range are re-targeted to the newly visible ones
+    spare = [grid.pop(cell) for cell in list(grid) if cell not in ahead]
+    spare.extend(cell_pool)
+    cell_pool.clear()
+
+    # The first screenful is drawn right away
+    for r in range(first_row, last_row):
+        for c in range(first_col, last_col):
+            if (r, c) in grid:
+                continue
+            items = spare.pop() if spare else new_cell_items()
+            show_cell(items, r, c)
+            grid[(r, c)] = items
+
+    # Items that are not needed any more wait in the pool for the next render
+    for items in spare:
+        for item in items:
+            canvas.itemconfigure(item, state="hidden", tags="")
+    cell_pool.extend(spare)
+    canvas.tag_raise(selection_item)
+
+    # Rows nearest to the screen are popped (drawn) first
+    middle = (first_row + last_row) / 2
+    pending_cells = sorted((cell for cell in ahead if cell not in grid),
+                           key=lambda cell: abs(cell[0] - middle), reverse=True)
+    if pending_cells:
+        render_job = root.after(1, render_pending)
+
+# Draw queued cells in small time-budgeted batches so the window stays responsive
+def render_pending():
+    global render_job
+    render_job = None
+    deadline = time.perf_counter() + RENDER_BUDGET
+    while pending_cells and time.perf_counter() < deadline:
+        cell = pending_cells.pop()
+        if cell not in grid:
+            items = cell_pool.pop() if cell_pool else new_cell_items()
+            show_cell(items, *cell)
+            grid[cell] = items
+    canvas.tag_raise(selection_item)
+    if pending_cells:
+        render_job = root.after(1, render_pending)
+
+# Rows that fit on the screen in full
+def screen_rows():
+    return max(1, canvas.winfo_height() // ROW_HEIGHT)
+
+# y of row r on the canvas, kept just outside the window for rows far from it
+def window_y(r):
+    return min(max((r - top_row) * ROW_HEIGHT, -ROW_HEIGHT), canvas.winfo_height() + ROW_HEIGHT)
+
+# Make row top the first one on screen. On short scrolls the drawn cells (tagged "cell") move
+# with their rows, after longer jumps they are all re-targeted by the next render
+def set_top_row(top):
+    global top_row
+    top = min(max(0, top), max(0, rows - screen_rows()))
+    if top != top_row:
+        if abs(top - top_row) <= 2 * screen_rows():
+            canvas.move("cell", 0, (top_row - top) * ROW_HEIGHT)
+        else:
+            cell_pool.extend(grid.values())
+            grid.clear()
+        top_row = top
+        if editing_cell is not None:
+            canvas.coords(editor_item, editing_cell[1] * COL_WIDTH, window_y(editing_cell[0]))
+        draw_selection()
+
+# Create the background and text items for the pool of grid cells
+def new_cell_items():
+    rect = canvas.create_rectangle(0, 0, 0, 0, outline="#d0d0d0")
+    text = canvas.create_text(0, 0, anchor="w", font=("Arial", 10))
+    return rect, text
+
+# Point a pair of canvas items at a cell of the grid
+def show_cell(items, r, c):
+    rect, text = items
+    x, y = c * COL_WIDTH, (r - top_row) * ROW_HEIGHT
+    canvas.coords(rect, x, y, x + COL_WIDTH, y + ROW_HEIGHT)
+    canvas.coords(text, x + 5, y + ROW_HEIGHT / 2)
+    canvas.itemconfigure(rect, fill=cell_color(r, c), state="normal", tags="cell")
+    canvas.itemconfigure(text, text=format_cell(cell_value(view_rows[r], c)), state="normal", tags="cell")
+
+# Text shown for a value, cut to the width of a column
+def format_cell(value):
+    text = str(value)
+    if len(text) > CELL_CHARS:
+        text = text[:CELL_CHARS - 1] + "\u2026"
+    return text
+
+# Work out the cell under an event from the row and column layout
+def cell_at(event):
+    r = top_row + int(canvas.canvasy(event.y) // ROW_HEIGHT)
+    c = int(canvas.canvasx(event.x) // COL_WIDTH)
+    if 0 <= r < rows and 0 <= c < cols:
+        return r, c
+    return None
+
+# Single click handler for the whole grid, dispatches to on_cell_click
+def on_canvas_click(event):
+    cell = cell_at(event)
+    if cell:
+        finish_edit()
+        on_cell_click(event, *cell)
+
+def on_canvas_double_click(event):
+    cell = cell_at(event)
+    if cell:
+        edit_cell(*cell)
+
+# Open the single in-place editor over a cell
+def edit_cell(r, c):
+    global editing_cell
+    finish_edit()
+    if refuse_mapped():
+        return
+    editing_cell = (r, c)
+    cell_editor.delete(0, tk.END)
+    cell_editor.insert(0, full_data.iat[view_rows[r], c])
+    cell_editor.select_range(0, tk.END)
+    canvas.coords(editor_item, c * COL_WIDTH, window_y(r))
+    canvas.itemconfigure(editor_item, state="normal")
+    cell_editor.focus_set()
+
+# Write the editor text back into full_data and hide the editor
+def finish_edit(event=None):
+    global editing_cell
+    if editing_cell is None:
+        return
+    r, c = editing_cell
+    editing_cell = None
+    value = cell_editor.get()
+    if value != str(full_data.iat[view_rows[r], c]):
+        set_cell_value(view_rows[r], c, value)
+        if (r, c) in grid:
+            show_cell(grid[(r, c)], r, c)
+    canvas.itemconfigure(editor_item, state="hidden")
+    canvas.focus_set()
+
+# Hide the editor without keeping what was typed
+def cancel_edit(event=None):
+    global editing_cell
+    if editing_cell is None:
+        return
+    editing_cell = None
+    canvas.itemconfigure(editor_item, state="hidden")
+    canvas.focus_set()
+
+# Write an edited value back into full_data, keeping numeric columns numeric. Edits made while
+# a file is loading are remembered for the data that replaces the rows shown so far
+def set_cell_value(row, c, text):
+    global store_edits
+    if load_edits is not None:
+        load_edits[(row, c)] = text
+    try:
+        value = pd.to_numeric(text) if pd.api.types.is_numeric_dtype(full_data[c].dtype) else text
+        full_data.iat[row, c] = value
+    except (ValueError, TypeError):
+        full_data[c] = full_data[c].astype(object)
+        full_data.iat[row, c] = text
+
+    # The column is typed again the next time a filter reads it, its profile is stale until then
+    with store_lock:
+        column_store[c] = None
+        store_edits += 1
+    release_shared(c)
+    forget_filter_results(c)
+    if c in filter_slots:
+        filter_slots[c].summary.configure(text="edited")
+
+# Scroll the canvas and refresh the visible cells. The vertical scrollbar gives a fraction of
+# all rows or a number of rows or screens to move by
+def scroll_y_view(*args):
+    if args[0] == "moveto":
+        set_top_row(int(float(args[1]) * rows))
+    elif args[2] == "units":
+        set_top_row(top_row + int(args[1]))
+    else:
+        set_top_row(top_row + int(args[1]) * screen_rows())
+    render_viewport()
+
+def scroll_x_view(*args):
+    canvas.xview(*args)
+    render_viewport()
 
 # Dynamically update filter entries based on column count
 def update_filter_entries(column_count):
-    global filter_entries, filter_conditions
-    for widget in filter_frame.winfo_children():
-        widget.destroy()
+    global filter_columns
+
+    # Only the visible columns get filter widgets, the filters themselves live in filter_state
+    for c in [c for c in filter_state if c >= column_count]:
+        del filter_state[c]
+    filter_canvas.config(scrollregion=(0, 0, column_count * COL_WIDTH, FILTER_HEIGHT))
+
+    # Rebind every filter widget on the next render
+    filter_pool.extend(filter_slots.values())
+    filter_slots.clear()
+    filter_columns = None
+
+# Show filter widgets for the visible columns, re-targeting the ones that scrolled away
+def render_filter_entries(first_col, last_col):
+    global filter_columns
+    filter_canvas.xview_moveto(canvas.xview()[0])
+    if filter_columns == (first_col, last_col):
+        return
+    filter_columns = (first_col, last_col)
+
+    visible = range(first_col, last_col)
+    spare = [filter_slots.pop(c) for c in list(filter_slots) if c not in visible]
+    spare.extend(filter_pool)
+    filter_pool.clear()
+
+    for c in visible:
+        if c not in filter_slots:
+            slot = spare.pop() if spare else new_filter_slot()
+            show_filter_slot(slot, c)
+            filter_slots[c] = slot
+
+    for slot in spare:
+        slot.column = None
+        filter_canvas.itemconfigure(slot.item, state="hidden")
+    filter_pool.extend(spare)
+
+# Create a frame with the condition menu and text entry of one column filter
+def new_filter_slot():
+    slot = tk.Frame(filter_canvas)
+    slot.column = None
+    slot.condition = tk.StringVar(slot)
+    slot.text = tk.StringVar(slot)
+    slot.top = tk.Frame(slot)
+    slot.menu = ttk.OptionMenu(slot.top, slot.condition, "Contains", "Contains", "Equals", "Range",
+                               "Expression")
+    # Click sorts by this column, Shift-click adds it as a further sort key
+    slot.sort = ttk.Button(slot.top, width=3, command=lambda: toggle_sort(slot.column))
+    slot.sort.bind("<Shift-Button-1>", lambda event: toggle_sort(slot.column, add=True) or "break")
+    # The dropdown offers the column's most frequent values from its hash index
+    slot.entry = ttk.Combobox(slot, textvariable=slot.text, font=("Arial", 12),
+                              postcommand=lambda: slot.entry.configure(values=distinct_values(slot.column)))
+    # One line of the column's profile, clicking it shows the whole profile
+    slot.summary = tk.Label(slot, font=("Arial", 8), fg="gray", anchor="w", cursor="hand2")
+    slot.summary.bind("<Button-1>", lambda event: show_profile(slot.column))
+    slot.menu.pack(side="left", fill="x", expand=True)
+    slot.sort.pack(side="right")
+    slot.top.pack(fill="x")
+    slot.entry.pack(fill="x", pady=(5, 0))
+    slot.summary.pack(fill="x")
+    slot.item = filter_canvas.create_window(0, 5, window=slot, anchor="nw", width=COL_WIDTH - 10)
 
-    filter_entries = [tk.Entry(filter_frame, width=15, font=("Arial", 12)) for _ in range(column_count)]
-    filter_conditions = [tk.StringVar(filter_frame) for _ in range(column_count)]
+    # Whatever the user picks or types goes straight into the filter model
+    slot.condition.trace_add("write", lambda *args: store_filter(slot))
+    slot.text.trace_add("write", lambda *args: store_filter(slot))
+    return slot
 
-    for c in range(column_count):
-        ttk.OptionMenu(filter_frame, filter_conditions[c], "Contains", "Contains", "Equals", "Range").grid(row=0, column=c, padx=5, pady=5)
-        filter_entries[c].grid(row=1, column=c, padx=5, pady=5)
+# Point a filter slot at a column and show that column's filter in it
+def show_filter_slot(slot, c):
+    slot.column = None
+    condition, text = filter_state.get(c, ("Contains", ""))
+    slot.condition.set(condition)
+    slot.text.set(text)
+    slot.sort.configure(text=sort_label(c))
+    if mapped_file is not None:
+        slot.summary.configure(text="")
+    else:
+        slot.summary.configure(text=profile_label(c) if column_store[c] is not None else "edited")
+    slot.column = c
+    filter_canvas.coords(slot.item, c * COL_WIDTH + 5, 5)
+    filter_canvas.itemconfigure(slot.item, state="normal")
+
+# Arrow of a sorted column, with its place among the sort keys when there are several
+def sort_label(c):
+    for i, (column, ascending) in enumerate(sort_keys):
+        if column == c:
+            arrow = "\u25b2" if ascending else "\u25bc"
+            return f"{arrow}{i + 1}" if len(sort_keys) > 1 else arrow
+    return "\u21c5"
+
+# Short profile of a column for the filter header, '~' marks estimated distinct counts
+def profile_label(c):
+    profile = column_profile(c)
+    distinct = ("" if profile["exact"] else "~") + short_count(profile["distinct"])
+    return f"{profile['kind']} {distinct} uniq {short_count(profile['empty'])} empty"
+
+def short_count(count):
+    for size, suffix in ((1e9, "G"), (1e6, "M"), (1e3, "k")):
+        if count >= size:
+            return f"{count / size:.1f}{suffix}"
+    return str(count)
+
+# Show the whole profile of a column
+def show_profile(c):
+    if c is None or refuse_mapped():
+        return
+    try:
+        profile = column_profile(c)
+        slot = filter_slots.get(c)
+        if slot is not None:
+            slot.summary.configure(text=profile_label(c))
+        lines = [f"Type: {profile['kind']}", f"Rows: {profile['rows']:,}", f"Empty: {profile['empty']:,}",
+                 f"Distinct: {'' if profile['exact'] else 'about '}{profile['distinct']:,}"]
+        if profile["min"] is not None:
+            lines += [f"Min: {profile['min']}", f"Max: {profile['max']}"]
+        lines.append("Top values:" if profile["exact"] else "Top values (estimated from a sample):")
+        lines += [f"    {value}: {count:,}" for value, count in profile["top"]]
+        messagebox.showinfo(f"Column {c + 1}", "\n".join(lines))
+    except Exception as e:
+        messagebox.showerror("Error", str(e))
+
+# Keep the condition and text of a filter slot in the filter model
+def store_filter(slot):
+    if slot.column is not None:
+        filter_state[slot.column] = (slot.condition.get(), slot.text.get())
+        schedule_filter()
 
 # Handle cell, row, or column selection
 def on_cell_click(event, r, c):
@@ -180,69 +1987,145 @@ def on_cell_click(event, r, c):
     selected_row = r
     selected_col = c
 
-    # Highlight the clicked cell with a temporary color
-    if highlight_mode.get() == "Cell":
-        grid[r][c].config(bg="lightblue")  # Highlight clicked cell
-    elif highlight_mode.get() == "Row":
-        for col in range(cols):
-            grid[r][col].config(bg="lightblue")  # Highlight the whole row
-    elif highlight_mode.get() == "Column":
-        for row in range(rows):
-            grid[row][c].config(bg="lightblue")  # Highlight the whole column
-
-# GUI Setup
-root = tk.Tk()
-root.title("Enhanced Spreadsheet with Filters and Highlights")
-root.geometry("1000x600")  # Resize the window for better UI
-
-# Top Frame for Buttons
-button_frame = tk.Frame(root)
-button_frame.grid(row=0, column=0, sticky="ew", padx=10, pady=10)
-
-# Scrollable Canvas for the Data Grid and Filters
-canvas = tk.Canvas(root)
-scroll_y = tk.Scrollbar(root, orient="vertical", command=canvas.yview)
-scroll_x = tk.Scrollbar(root, orient="horizontal", command=canvas.xview)
-canvas_frame = tk.Frame(canvas)
-
-canvas.create_window((0, 0), window=canvas_frame, anchor="nw")
-canvas.config(yscrollcommand=scroll_y.set, xscrollcommand=scroll_x.set)
-
-# Layout for Scrollbars
-canvas.grid(row=1, column=0, sticky="nsew")
-scroll_y.grid(row=1, column=1, sticky="ns")
-scroll_x.grid(row=2, column=0, sticky="ew")
-
-# Create dynamic filter entries and buttons
-def style_button(btn):
-    btn.config(width=12, height=1, font=("Arial", 10), relief="solid", bg="#4CAF50", fg="white", bd=1)
-
-buttons = [
-    ("Open File", load_file),
-    ("Save File", save_file),
-    ("Apply Filter", apply_filter),
-    ("Clear Filters", clear_filters),
-    ("Highlight", highlight_cells_or_rows),
-    ("Reset Highlight", reset_highlight),
-]
-
-for text, command in buttons:
-    btn = tk.Button(button_frame, text=text, command=command)
-    style_button(btn)
-    btn.pack(side="left", padx=5)
-
-highlight_mode = tk.StringVar(value="Cell")
-highlight_modes = ["Cell", "Row", "Column"]
-
-highlight_mode_frame = tk.Frame(button_frame)
-highlight_mode_frame.pack(side="left", padx=5)
-
-for mode in highlight_modes:
-    rb = tk.Radiobutton(highlight_mode_frame, text=mode, variable=highlight_mode, value=mode)
-    rb.pack(side="left", padx=5)
-
-# Frame for Filters inside the Canvas
-filter_frame = tk.Frame(canvas_frame)
-filter_frame.grid(row=0, column=0, sticky="ew", pady=10)
-
-root.mainloop()
+    # Move the selection overlay instead of recoloring cells
+    canvas.focus_set()
+    draw_selection()
+
+# Draw the selected cell, row or column as one rectangle over the grid
+def draw_selection():
+    if selected_cell is None:
+        canvas.itemconfigure(selection_item, state="hidden")
+        return
+    r, c = selected_cell
+    mode = highlight_mode.get()
+    if mode == "Row":
+        canvas.coords(selection_item, 0, window_y(r), cols * COL_WIDTH, window_y(r + 1))
+    elif mode == "Column":
+        canvas.coords(selection_item, c * COL_WIDTH, window_y(0), (c + 1) * COL_WIDTH, window_y(rows))
+    else:
+        canvas.coords(selection_item, c * COL_WIDTH, window_y(r), (c + 1) * COL_WIDTH, window_y(r + 1))
+    canvas.itemconfigure(selection_item, state="normal")
+    canvas.tag_raise(selection_item)
+
+# Move the selection with the arrow keys, scrolling it into view
+def on_arrow_key(event):
+    if not rows or not cols:
+        return
+    dr, dc = {"Up": (-1, 0), "Down": (1, 0), "Left": (0, -1), "Right": (0, 1)}[event.keysym]
+    r, c = selected_cell or (0, 0)
+    r = min(max(r + dr, 0), rows - 1)
+    c = min(max(c + dc, 0), cols - 1)
+    scroll_to_cell(r, c)
+    on_cell_click(event, r, c)
+
+# Edit the selected cell from the keyboard
+def on_edit_key(event):
+    if selected_cell:
+        edit_cell(*selected_cell)
+
+# Scroll the canvas just enough for a cell to be fully visible
+def scroll_to_cell(r, c):
+    left, width = canvas.canvasx(0), canvas.winfo_width()
+    if r < top_row:
+        set_top_row(r)
+    elif r >= top_row + screen_rows():
+        set_top_row(r + 1 - screen_rows())
+    if c * COL_WIDTH < left:
+        canvas.xview_moveto(c / cols)
+    elif (c + 1) * COL_WIDTH > left + width:
+        canvas.xview_moveto(((c + 1) * COL_WIDTH - width) / (cols * COL_WIDTH))
+    render_viewport()
+
+atexit.register(release_shared)
+
+# GUI Setup (only when run as a program, worker processes import this file too)
+if __name__ == "__main__":
+    root = tk.Tk()
+    root.title("Enhanced Spreadsheet with Filters and Highlights")
+    root.geometry("1000x600")  # Resize the window for better UI
+    root.protocol("WM_DELETE_WINDOW", close_window)
+
+    # Top Frame for Buttons
+    button_frame = tk.Frame(root)
+    button_frame.grid(row=0, column=0, sticky="ew", padx=10, pady=10)
+
+    # Filters above the Data Grid, scrolled sideways together with it
+    filter_canvas = tk.Canvas(root, height=FILTER_HEIGHT, xscrollincrement=COL_WIDTH)
+    filter_canvas.grid(row=1, column=0, sticky="ew")
+
+    # Scrollable Canvas for the Data Grid (cells are drawn only for the visible area)
+    canvas = tk.Canvas(root, bg="white", xscrollincrement=COL_WIDTH)
+    scroll_y = tk.Scrollbar(root, orient="vertical", command=scroll_y_view)
+    scroll_x = tk.Scrollbar(root, orient="horizontal", command=scroll_x_view)
+
+    # The vertical scrollbar is set by render_viewport from the rows on screen
+    canvas.config(xscrollcommand=scroll_x.set)
+    canvas.bind("<Configure>", render_viewport)
+    canvas.bind("<Button-1>", on_canvas_click)
+    canvas.bind("<Double-Button-1>", on_canvas_double_click)
+    for key in ("<Up>", "<Down>", "<Left>", "<Right>"):
+        canvas.bind(key, on_arrow_key)
+    canvas.bind("<Return>", on_edit_key)
+    canvas.bind("<F2>", on_edit_key)
+
+    # Overlay showing the selected cell, row or column
+    selection_item = canvas.create_rectangle(0, 0, 0, 0, outline="#1e90ff", width=2, state="hidden")
+
+    # Single editor placed over the cell being edited
+    cell_editor = tk.Entry(canvas, font=("Arial", 10))
+    editor_item = canvas.create_window(0, 0, window=cell_editor, anchor="nw",
+                                       width=COL_WIDTH, height=ROW_HEIGHT, state="hidden")
+    cell_editor.bind("<Return>", finish_edit)
+    cell_editor.bind("<FocusOut>", finish_edit)
+    cell_editor.bind("<Escape>", cancel_edit)
+
+    # Layout for Scrollbars
+    canvas.grid(row=2, column=0, sticky="nsew")
+    scroll_y.grid(row=2, column=1, sticky="ns")
+    scroll_x.grid(row=3, column=0, sticky="ew")
+
+    # Let the grid take up the space left by the buttons and filters
+    root.grid_rowconfigure(2, weight=1)
+    root.grid_columnconfigure(0, weight=1)
+
+    # Create dynamic filter entries and buttons
+    def style_button(btn):
+        btn.config(width=12, height=1, font=("Arial", 10), relief="solid", bg="#4CAF50", fg="white", bd=1)
+
+    buttons = [
+        ("Open File", load_file),
+        ("Open Large CSV", open_mapped_file),
+        ("Save File", save_file),
+        ("Apply Filter", apply_filter),
+        ("Clear Filters", clear_filters),
+        ("Highlight", highlight_cells_or_rows),
+        ("Reset Highlight", reset_highlight),
+    ]
+
+    for text, command in buttons:
+        btn = tk.Button(button_frame, text=text, command=command)
+        style_button(btn)
+        btn.pack(side="left", padx=5)
+
+    highlight_mode = tk.StringVar(value="Cell")
+    highlight_modes = ["Cell", "Row", "Column"]
+
+    highlight_mode_frame = tk.Frame(button_frame)
+    highlight_mode_frame.pack(side="left", padx=5)
+
+    for mode in highlight_modes:
+        rb = tk.Radiobutton(highlight_mode_frame, text=mode, variable=highlight_mode, value=mode, command=draw_selection)
+        rb.pack(side="left", padx=5)
+
+    # Progress of a file being loaded, shown only while it loads
+    load_frame = tk.Frame(button_frame)
+    load_label = tk.Label(load_frame, font=("Arial", 10))
+    load_progress = ttk.Progressbar(load_frame, length=120, maximum=100)
+    load_cancel = tk.Button(load_frame, text="Cancel", command=cancel_load)
+    load_label.pack(side="left")
+    load_progress.pack(side="left", padx=5)
+    load_cancel.pack(side="left")
+
+    poll_filter_results()
+    poll_load_results()
+    root.mainloop()